@@ -1,62 +1,39 @@
 import os
-import csv
-import json
-import random
+import sys
+from math import comb
 from collections import Counter
 
+import numpy as np
+import orjson
+
+from dartbot_core import load_records, t20_counts
+
 # Configuration
 FOLDER = os.path.dirname(os.path.abspath(__file__))
 DATASET_DIR = os.path.join(FOLDER, 'Datasets')
-CSV_GLOB = '.csv'
-TRIALS_PER_BIN = 10000  # Monte Carlo trials per bin
 BIN_START = 20
 BIN_END = 110
 BIN_WIDTH = 10
 OUTPUT_JSON = os.path.join(FOLDER, 'simulation_results.json')
 SAMPLE_TURNS_PER_BIN = 100  # how many simulated turns to save per bin (for inspection)
+SAVE_SAMPLES = os.getenv('SAVE_SAMPLES') == '1'  # set SAVE_SAMPLES=1 to draw and save sample turns
+RNG_SEED = 0
 
 # Read CSVs and compute per-file stats
 if not os.path.isdir(DATASET_DIR):
     raise FileNotFoundError(f"Datasets folder not found: {DATASET_DIR}")
 
-files = [f for f in os.listdir(DATASET_DIR) if f.lower().endswith(CSV_GLOB)]
 records = []  # (fname, average, aimed_count, hit_count, miss_bed_counter)
+for record in load_records(DATASET_DIR):
+    aimed, hits, miss_beds = t20_counts(record)
+    records.append((record.fname, record.average, aimed, hits, miss_beds))
 
-for fname in sorted(files):
-    path = os.path.join(DATASET_DIR, fname)
-    try:
-        with open(path, newline='', encoding='utf-8') as fh:
-            raw_lines = fh.read().splitlines()
-        filtered = [ln for ln in raw_lines if not ln.strip().startswith('//') and ln.strip() != '']
-        if not filtered:
-            print(f"Skipping {fname}: no CSV content after filtering comments")
-            continue
-        reader = csv.DictReader(filtered)
-        if not reader.fieldnames or not all(col in reader.fieldnames for col in ['aimedat', 'bed', 'average']):
-            print(f"Skipping {fname}: missing required column(s) (need aimedat, bed, average)")
-            continue
-        rows = list(reader)
-        if not rows:
-            continue
-        try:
-            avg = float(rows[0].get('average') or 0.0)
-        except Exception:
-            avg = None
-        aimed = 0
-        hits = 0
-        miss_beds = Counter()
-        for row in rows:
-            aimedat = (row.get('aimedat') or '').strip().lower()
-            bed = (row.get('bed') or '').strip().lower()
-            if aimedat == 't20':
-                aimed += 1
-                if bed == 't20':
-                    hits += 1
-                else:
-                    miss_beds[bed] += 1
-        records.append((fname, avg, aimed, hits, miss_beds))
-    except Exception as e:
-        print(f"Error reading {fname}: {e}")
+# Per-file T20 tallies for the bin aggregation
+# (only files with a usable average and at least one T20 dart can land in a bin)
+binnable = [r for r in records if r[1] is not None and r[2] > 0]
+avgs = np.fromiter((r[1] for r in binnable), dtype=float, count=len(binnable))
+rec_aimed = np.fromiter((r[2] for r in binnable), dtype=np.int64, count=len(binnable))
+rec_hits = np.fromiter((r[3] for r in binnable), dtype=np.int64, count=len(binnable))
 
 # Compute overall empirical hit rate (used only as fallback)
 overall_hits = sum(r[3] for r in records)
@@ -77,6 +54,10 @@ if total_misses == 0:
     total_misses = 1
 
 empirical_miss_dist = {bed: cnt / total_misses for bed, cnt in agg_miss.items()} # convert to probabilities based on a miss
+miss_beds = list(empirical_miss_dist.keys())
+miss_probs = np.array(list(empirical_miss_dist.values()))
+miss_cdf = np.cumsum(miss_probs)
+miss_cdf[-1] = 1.0
 
 # Bins setup
 bins = []  # list of (label, low, high, rep_average)
@@ -94,111 +75,59 @@ if BIN_END == 110:
     bins.append((label, BIN_END + 1, float('inf'), BIN_END + BIN_WIDTH/2.0))
 
 # Simulation per bin
-random.seed(0)
+rng = np.random.default_rng(RNG_SEED)  # single PCG64 generator for every draw in the run
 results = {}
+
+# Assign every file to its bin in one pass and accumulate hits / aimed per bin
+bin_lows = np.array([low for _, low, _, _ in bins], dtype=float)
+bin_highs = np.array([high for _, _, high, _ in bins], dtype=float)
+bin_of = np.digitize(avgs, bin_lows) - 1
+# bin edges are whole numbers, so an average can fall between one bin's high and the next bin's low
+in_bin = (bin_of >= 0) & (avgs <= bin_highs[np.maximum(bin_of, 0)])
+bin_hits = np.zeros(len(bins), dtype=np.int64)
+bin_aimed = np.zeros(len(bins), dtype=np.int64)
+np.add.at(bin_hits, bin_of[in_bin], rec_hits[in_bin])
+np.add.at(bin_aimed, bin_of[in_bin], rec_aimed[in_bin])
+
 bin_stats = []
-for label, low, high, rep in bins:
+for (label, low, high, rep), hits, aimed in zip(bins, bin_hits.tolist(), bin_aimed.tolist()):
     # predicted hit probability from datasets in this bin
-    bin_hits = 0
-    bin_aimed = 0
-    for _, avg, aimed, hits, _ in records:
-        if avg is None or aimed == 0:
-            continue
-        in_bin = (avg >= low and avg <= high) if high != float('inf') else (avg >= low)
-        if in_bin:
-            bin_hits += hits
-            bin_aimed += aimed
-
-    if bin_aimed > 0:
-        p_hit = bin_hits / bin_aimed
-    else:
-        p_hit = None
-
-    bin_stats.append({'label': label, 'low': low, 'high': high, 'rep': rep, 'p_hit': p_hit, 'aimed': bin_aimed})
+    p_hit = hits / aimed if aimed > 0 else None
+    bin_stats.append({'label': label, 'low': low, 'high': high, 'rep': rep, 'p_hit': p_hit, 'aimed': aimed})
 
 # Fill empty bins by borrowing nearest populated bin
 # For bins higher than the borrowed bin's average: increase rate by 10%
 # For bins lower than the borrowed bin's average: decrease rate by 10%
 increase_factor = 1.1
 decrease_factor = 0.9
-for i, b in enumerate(bin_stats):
-    if b['p_hit'] is None:
-        # Find nearest populated bin (checking lower first, then higher)
-        lower_idx = next((j for j in range(i - 1, -1, -1) if bin_stats[j]['p_hit'] is not None), None)
-        higher_idx = next((j for j in range(i + 1, len(bin_stats)) if bin_stats[j]['p_hit'] is not None), None)
-        
-        # Determine which is closer
-        if lower_idx is not None and higher_idx is not None:
-            dist_lower = i - lower_idx
-            dist_higher = higher_idx - i
-            source_idx = lower_idx if dist_lower <= dist_higher else higher_idx
-        elif lower_idx is not None:
-            source_idx = lower_idx
-        elif higher_idx is not None:
-            source_idx = higher_idx
-        else:
-            b['p_hit'] = overall_p_hit
-            continue
-        
-        source_p_hit = bin_stats[source_idx]['p_hit']
-        source_rep = bin_stats[source_idx]['rep']
-        
-        # If current bin average is higher, increase the rate; if lower, decrease
-        if b['rep'] > source_rep:
-            b['p_hit'] = source_p_hit * increase_factor
-        else:
-            b['p_hit'] = source_p_hit * decrease_factor
+# Bins fill in order and a filled bin counts as populated for the next one (ties go to the lower bin),
+# so an empty bin compounds the increase from the last populated bin below it. Empty bins below the
+# first populated bin start from that bin's rate decreased once and compound upwards from there.
+p_hits = np.array([np.nan if b['p_hit'] is None else b['p_hit'] for b in bin_stats])
+populated = ~np.isnan(p_hits)
+bin_idx = np.arange(len(bin_stats))
+last_populated = np.maximum.accumulate(np.where(populated, bin_idx, -1))
+lead_p_hit = p_hits[np.argmax(populated)] * decrease_factor if populated.any() else overall_p_hit
+filled_p_hits = np.where(
+    last_populated >= 0,
+    p_hits[np.maximum(last_populated, 0)] * increase_factor ** (bin_idx - last_populated),
+    lead_p_hit * increase_factor ** bin_idx,
+)
+for b, p_hit in zip(bin_stats, filled_p_hits):
+    b['p_hit'] = float(p_hit)
 
 # Build results using finalized p_hit values
 for b in bin_stats:
     label = b['label']
-    low = b['low']
-    high = b['high']
     rep = b['rep']
-    p_hit = b['p_hit']
-
-    # clamp
-    p_hit = max(0.0, min(1.0, p_hit))
-
-    # Monte Carlo
-    hit_counts = [0, 0, 0, 0]  # counts for 0,1,2,3 hits
-    miss_bed_counter = Counter()
-    per_dart_hit_counts = [0, 0, 0]
-    per_dart_miss_counters = [Counter() for _ in range(3)]
-    sample_turns = []
-    for t in range(TRIALS_PER_BIN):
-        hits_in_turn = 0
-        this_turn = []
-        for d in range(3):
-            if random.random() < p_hit:
-                hits_in_turn += 1
-                per_dart_hit_counts[d] += 1
-                this_turn.append('t20') # hit if a random number is less than p_hit
-            else:
-                # sample a miss bed according to empirical miss distribution
-                r = random.random()
-                cumulative = 0.0
-                chosen = None
-                for bed, prob in empirical_miss_dist.items():
-                    cumulative += prob
-                    if r <= cumulative:
-                        chosen = bed
-                        break
-                if chosen is None:
-                    chosen = next(iter(empirical_miss_dist))
-                miss_bed_counter[chosen] += 1
-                per_dart_miss_counters[d][chosen] += 1
-                this_turn.append(chosen)
-        hit_counts[hits_in_turn] += 1
-        if len(sample_turns) < SAMPLE_TURNS_PER_BIN:
-            sample_turns.append(this_turn) # randomly choose a miss bed
-
-    total_turns = TRIALS_PER_BIN
-    probs = {f"{k}_hits": hit_counts[k] / total_turns for k in range(4)} # probabilities of 0,1,2,3 hits
-    expected_hits = sum(k * hit_counts[k] for k in range(4)) / total_turns # expected hits per turn
-    # normalize miss bed distribution
-    total_missed_samples = sum(miss_bed_counter.values())
-    miss_bed_dist = {bed: cnt / total_missed_samples for bed, cnt in miss_bed_counter.items()} if total_missed_samples > 0 else {} # miss bed distribution
+    p_hit = max(0.0, min(1.0, b['p_hit']))  # clamp
+
+    # Three independent darts with the same p_hit: the hit count is Binomial(3, p_hit),
+    # so its distribution is computed exactly rather than estimated by Monte Carlo
+    probs = {f"{k}_hits": comb(3, k) * p_hit ** k * (1 - p_hit) ** (3 - k) for k in range(4)} # probabilities of 0,1,2,3 hits
+    expected_hits = 3 * p_hit # expected hits per turn
+    # conditional on a miss, beds follow the empirical miss distribution
+    miss_bed_dist = dict(empirical_miss_dist) # miss bed distribution
 
     results[label] = {
         'rep_average': rep,
@@ -206,33 +135,45 @@ for b in bin_stats:
         'expected_hits_per_turn': expected_hits,
         'probabilities_0_to_3_hits': probs,
         'miss_bed_distribution': miss_bed_dist,
-        'sample_turns': sample_turns,
-        'trial_count': TRIALS_PER_BIN
-    } # simulated turns results (first 100 stored)
+    }
+
+    if SAVE_SAMPLES:
+        # A few simulated turns are still drawn dart by dart (for inspection)
+        sample_hit_mask = rng.random((SAMPLE_TURNS_PER_BIN, 3)) < p_hit
+        # map uniforms onto the miss CDF to pick every sampled miss bed at once
+        miss_idx = iter(np.searchsorted(miss_cdf, rng.random(int((~sample_hit_mask).sum())), side='right'))
+        results[label]['sample_turns'] = [
+            ['t20' if hit else miss_beds[next(miss_idx)] for hit in turn]
+            for turn in sample_hit_mask
+        ] # sample simulated turns (first 100 stored)
 
 # Save results
-with open(OUTPUT_JSON, 'w', encoding='utf-8') as fh:
-    json.dump({'model': {'slope': None, 'intercept': None}, 'empirical_miss_dist': empirical_miss_dist, 'bins': results}, fh, indent=2)
-
-# Print a concise summary
-print(f"Simulation completed. Results saved to: {OUTPUT_JSON}\n")
+with open(OUTPUT_JSON, 'wb') as fh:
+    fh.write(orjson.dumps(
+        {'model': {'slope': None, 'intercept': None}, 'empirical_miss_dist': empirical_miss_dist, 'bins': results},
+        option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY,
+    ))
+
+# Print a concise summary (built up and written in one go)
+out = [f"Simulation completed. Results saved to: {OUTPUT_JSON}\n\n"]
 for label, info in results.items():
-    print(f"Bin: {label} (rep avg {info['rep_average']:.1f})")
-    print(f"  predicted p_hit per dart: {info['predicted_p_hit_per_dart']:.2%}")
-    print(f"  expected hits per 3-dart turn: {info['expected_hits_per_turn']:.3f}")
+    out.append(f"Bin: {label} (rep avg {info['rep_average']:.1f})\n")
+    out.append(f"  predicted p_hit per dart: {info['predicted_p_hit_per_dart']:.2%}\n")
+    out.append(f"  expected hits per 3-dart turn: {info['expected_hits_per_turn']:.3f}\n")
     probs = info['probabilities_0_to_3_hits']
-    print(f"  P(0 hits): {probs['0_hits']:.3%}, P(1 hit): {probs['1_hits']:.3%}, P(2 hits): {probs['2_hits']:.3%}, P(3 hits): {probs['3_hits']:.3%}")
+    out.append(f"  P(0 hits): {probs['0_hits']:.3%}, P(1 hit): {probs['1_hits']:.3%}, P(2 hits): {probs['2_hits']:.3%}, P(3 hits): {probs['3_hits']:.3%}\n")
     top_misses = sorted(info['miss_bed_distribution'].items(), key=lambda x: -x[1])[:5]
     if top_misses:
-        print("  miss bed top distribution:")
+        out.append("  miss bed top distribution:\n")
         for bed, prob in top_misses:
-            print(f"    {bed}: {prob:.2%}")
+            out.append(f"    {bed}: {prob:.2%}\n")
     # print a small sample of turns
     sample = info.get('sample_turns', [])[:10]
     if sample:
-        print(f"  sample simulated turns (first {len(sample)}):")
+        out.append(f"  sample simulated turns (first {len(sample)}):\n")
         for turn in sample:
-            print(f"    {turn}")
-    print()
+            out.append(f"    {turn}\n")
+    out.append("\n")
 
-print("Done.")
+out.append("Done.\n")
+sys.stdout.write("".join(out))
@@ -3,8 +3,15 @@ Flask API wrapper for Dartbot simulator
 Exposes the Python simulation logic as REST endpoints
 """
 import os
-import json
-from flask import Flask, jsonify, request
+import copy
+import functools
+import gzip
+import hashlib
+from collections import namedtuple
+
+import numpy as np
+import orjson
+from flask import Flask, request, send_file
 from flask_cors import CORS
 
 app = Flask(__name__)
@@ -15,42 +22,80 @@ FOLDER = os.path.dirname(os.path.abspath(__file__))
 CANDIDATES_JSON = os.path.join(FOLDER, 'checkout_candidates.json')
 OUTPUT_JSON = os.path.join(FOLDER, 'checkout_simulation_results.json')
 DOUBLE_OUTCOMES_JSON = os.path.join(FOLDER, 'double_outcomes.json')
-IMPOSSIBLE_CHECKOUT_SCORES = {1, 159, 162, 163, 165, 166, 168, 169}
+SIMULATION_RESULTS_JSON = os.path.join(FOLDER, 'simulation_results.json')
+IMPOSSIBLE_CHECKOUT_SCORES = frozenset({1, 159, 162, 163, 165, 166, 168, 169})
+CHECKOUT_RANGE = range(2, 171)
+# Scores the bot may try to check out from: in range, not impossible, and even for double-out
+CHECKOUT_ATTEMPT_SCORES_DOUBLE = frozenset(s for s in CHECKOUT_RANGE if s not in IMPOSSIBLE_CHECKOUT_SCORES and s % 2 == 0)
+CHECKOUT_ATTEMPT_SCORES_STRAIGHT = frozenset(s for s in CHECKOUT_RANGE if s not in IMPOSSIBLE_CHECKOUT_SCORES)
+# One-dart finishes: doubles 2-40 or bull for double-out, any single 1-20, 25 or 50 for straight-out
+FINISHABLE_SCORES_DOUBLE = frozenset([50] + list(range(2, 41, 2)))
+FINISHABLE_SCORES_STRAIGHT = frozenset(list(range(1, 21)) + [25, 50])
+
+# The loaded data and the tables built from it below are shared read-only across requests
+# (and across gunicorn workers via preload_app), so handlers must never mutate them.
 
 # Load checkout candidates (optimal routes for all scores)
 checkout_candidates = {}
+CHECKOUT_PATH_SCORES = frozenset()  # scores with at least one checkout candidate
 try:
-    with open(CANDIDATES_JSON, 'r', encoding='utf-8') as fh:
-        checkout_candidates = json.load(fh)
+    with open(CANDIDATES_JSON, 'rb') as fh:
+        # keyed by int score once here so lookups never build str(score)
+        checkout_candidates = {int(k): v for k, v in orjson.loads(fh.read()).items() if k.isdigit()}
+    CHECKOUT_PATH_SCORES = frozenset(k for k, v in checkout_candidates.items() if v)
     print(f"Loaded checkout candidates from {CANDIDATES_JSON}")
 except Exception as e:
     print(f"Warning: Could not load checkout candidates: {e}")
 
+# The same sets as boolean lookup arrays indexed by score, for vectorised membership tests.
+# Nothing above 170 is finishable or has a checkout path, so the last slot is a False catch-all.
+LOOKUP_SIZE = 172
+
+
+def score_lookup(scores) -> np.ndarray:
+    lookup = np.zeros(LOOKUP_SIZE, dtype=bool)
+    lookup[[s for s in scores if 0 <= s < LOOKUP_SIZE - 1]] = True
+    return lookup
+
+
+FINISHABLE_LOOKUP_DOUBLE = score_lookup(FINISHABLE_SCORES_DOUBLE)
+FINISHABLE_LOOKUP_STRAIGHT = score_lookup(FINISHABLE_SCORES_STRAIGHT)
+# Scores below 2 never count as having a checkout path, whatever the candidates file holds
+CHECKOUT_PATH_LOOKUP = score_lookup(s for s in CHECKOUT_PATH_SCORES if s >= 2)
+
 # Load precomputed results on startup
 checkout_data = {}
 try:
-    with open(OUTPUT_JSON, 'r', encoding='utf-8') as fh:
-        checkout_data = json.load(fh)
+    with open(OUTPUT_JSON, 'rb') as fh:
+        checkout_data = orjson.loads(fh.read())
     print(f"Loaded checkout data from {OUTPUT_JSON}")
 except Exception as e:
     print(f"Warning: Could not load checkout data: {e}")
 
-simulation_results_data = {}
-try:
-    sim_path = os.path.join(FOLDER, 'simulation_results.json')
-    with open(sim_path, 'r', encoding='utf-8') as fh:
-        simulation_results_data = json.load(fh)
-    print(f"Loaded simulation results from {sim_path}")
-except Exception as e:
-    print(f"Warning: Could not load simulation results: {e}")
+# Per-bin recommendations flattened to one (average_range, score) -> recommendation lookup
+AVAILABLE_BINS = tuple(checkout_data.get('bins', {}).keys())
+BIN_INDEX = {
+    (average_range, int(k)): recommendation
+    for average_range, bin_data in checkout_data.get('bins', {}).items()
+    for k, recommendation in bin_data.items()
+    if k.isdigit()
+}
 
-double_outcomes_data = {}
-try:
-    with open(DOUBLE_OUTCOMES_JSON, 'r', encoding='utf-8') as fh:
-        double_outcomes_data = json.load(fh)
-    print(f"Loaded double outcomes data from {DOUBLE_OUTCOMES_JSON}")
-except Exception as e:
-    print(f"Warning: Could not load double outcomes data: {e}")
+
+def ojsonify(obj, status: int = 200):
+    # jsonify equivalent that serialises with orjson
+    return app.response_class(orjson.dumps(obj), status=status, mimetype='application/json')
+
+
+def request_json():
+    # Decode a JSON object request body with orjson; None if there isn't one (wrong content type, bad JSON, not an object)
+    if not request.is_json:
+        return None
+    try:
+        data = orjson.loads(request.get_data(cache=False))
+    except orjson.JSONDecodeError:
+        return None
+    return data if isinstance(data, dict) else None
 
 
 def is_finishable_score(score: int, out_rule: str = 'double') -> bool:
@@ -60,132 +105,220 @@ def is_finishable_score(score: int, out_rule: str = 'double') -> bool:
     For straight-out: 1-20, 25, 50
     """
     if out_rule == 'double':
-        # Doubles 2-40 (all even) or bull (50)
-        return score == 50 or (score >= 2 and score <= 40 and score % 2 == 0)
+        return score in FINISHABLE_SCORES_DOUBLE
     else:  # straight
-        # Any single 1-50
-        return (score >= 1 and score <= 20) or score == 25 or score == 50
+        return score in FINISHABLE_SCORES_STRAIGHT
 
 
 def has_checkout_path(score: int) -> bool:
     # Check if a score has a checkout path available in checkout_candidates
-    return str(score) in checkout_candidates and len(checkout_candidates[str(score)]) > 0
+    return score in CHECKOUT_PATH_SCORES
 
 
-def evaluate_approach_segment(score: int, segment: int, out_rule: str = 'double', darts_available: int = 3) -> dict:
+# Immutable result of evaluating one treble segment, so evaluations can be memoised and shared.
+# reachable_scores holds (score, finishable, has_checkout) tuples in discovery order, when requested.
+ApproachAnalysis = namedtuple('ApproachAnalysis', [
+    'segment',
+    'treble_value',
+    'reachable_scores',
+    'finishable_count',
+    'has_checkout_path_count',
+    'immediately_finishable',
+    'best_remaining',
+])
+
+
+@functools.lru_cache(maxsize=None)
+def _approach_deltas(segment: int, darts_available: int):
     """
-    Evaluate how good a treble segment is for approach play.
-    Returns analysis of what remaining scores are reachable.
+    Every amount a visit can take off when starting on this treble segment, in discovery order.
+    Returns (deltas, by_trebles_alone) as arrays over the distinct deltas, where by_trebles_alone
+    marks deltas first reached by trebles alone rather than with setup darts.
+    """
+    # Each delta is treble_value * trebles_hit + value * hits, where the remaining darts all go at one
+    # setup value: the common singles plus this segment's single, then the outer and inner bull.
+    # The grid is laid out (trebles_hit, value, hits) so that, flattened, it visits deltas in the
+    # same order as walking treble hits, then setup values, then hit counts.
+    setup_values = np.array(list(set([20, 19, 18, 17, segment])) + [25, 50])
+    trebles_hit = np.arange(darts_available + 1)[:, None, None]
+    hits = np.arange(darts_available + 1)[None, None, :]
+    deltas = 3 * segment * trebles_hit + setup_values[None, :, None] * hits
+    valid = np.broadcast_to(hits <= darts_available - trebles_hit, deltas.shape)
+    flat_deltas = deltas[valid]
+    flat_hits = np.broadcast_to(hits, deltas.shape)[valid]
+    _, first_seen = np.unique(flat_deltas, return_index=True)
+    first_seen.sort()
+    return flat_deltas[first_seen], flat_hits[first_seen] == 0
+
+
+@functools.lru_cache(maxsize=4096)
+def _evaluate_approach_segment(score: int, segment: int, out_rule: str = 'double', darts_available: int = 3,
+                               need_detail: bool = False):
+    """
+    Memoised core of evaluate_approach_segment.
+    Returns an ApproachAnalysis, or None for an invalid segment.
+    reachable_scores is only filled in when need_detail is set; scoring a segment just needs the totals.
     """
     if segment < 1 or segment > 20:
-        return {'valid': False, 'reason': 'Invalid segment'}
+        return None
     
     treble_value = 3 * segment
-    analysis = {
-        'segment': segment,
-        'treble_value': treble_value,
-        'reachable_scores': [],
-        'finishable_count': 0,
-        'has_checkout_path_count': 0,
-        'immediately_finishable': False,
-        'best_remaining': None,
-    }
     
-    # Calculate all possible remaining scores by hitting treble different numbers of times
-    # Then hitting lower value alternatives for remaining darts
-    visited = set()
-    
-    # Try hitting treble N times (0 to darts_available)
-    for trebles_hit in range(darts_available + 1):
-        score_after_trebles = score - (treble_value * trebles_hit)
-        if score_after_trebles < 0:
-            continue
-        
-        remaining_darts = darts_available - trebles_hit
-        
-        # Base case: hit exactly right number of trebles
-        if score_after_trebles not in visited:
-            visited.add(score_after_trebles)
-            is_finishable = is_finishable_score(score_after_trebles, out_rule)
-            has_path = has_checkout_path(score_after_trebles) if score_after_trebles >= 2 else False
-            
-            analysis['reachable_scores'].append({
-                'score': score_after_trebles,
-                'finishable': is_finishable,
-                'has_checkout': has_path,
-            })
-            
-            if is_finishable:
-                analysis['finishable_count'] += 1
-            if has_path:
-                analysis['has_checkout_path_count'] += 1
-            if score_after_trebles == 0:
-                analysis['immediately_finishable'] = True
-        
-        # Try mixing in single hits with remaining darts
-        if remaining_darts > 0:
-            # Include common segments AND the actual segment being evaluated
-            # This allows proper evaluation of sequences like T19 + S19 + S19
-            single_segments_to_try = set([20, 19, 18, 17, segment])
-            for single_segment in single_segments_to_try:
-                single_value = single_segment
-                for singles_hit in range(remaining_darts + 1):
-                    score_after_mixed = score_after_trebles - (single_value * singles_hit)
-                    if score_after_mixed < 0:
-                        continue
-                    
-                    if score_after_mixed not in visited:
-                        visited.add(score_after_mixed)
-                        is_finishable = is_finishable_score(score_after_mixed, out_rule)
-                        has_path = has_checkout_path(score_after_mixed) if score_after_mixed >= 2 else False
-                        
-                        analysis['reachable_scores'].append({
-                            'score': score_after_mixed,
-                            'finishable': is_finishable,
-                            'has_checkout': has_path,
-                        })
-                        
-                        if is_finishable:
-                            analysis['finishable_count'] += 1
-                        if has_path:
-                            analysis['has_checkout_path_count'] += 1
-            
-            # Try bullseye values separately (outer bull = 25, inner bull = 50)
-            bullseye_values = [25, 50]
-            for bull_value in bullseye_values:
-                for bull_hits in range(remaining_darts + 1):
-                    score_after_bull = score_after_trebles - (bull_value * bull_hits)
-                    if score_after_bull < 0:
-                        continue
-                    
-                    if score_after_bull not in visited:
-                        visited.add(score_after_bull)
-                        is_finishable = is_finishable_score(score_after_bull, out_rule)
-                        has_path = has_checkout_path(score_after_bull) if score_after_bull >= 2 else False
-                        
-                        analysis['reachable_scores'].append({
-                            'score': score_after_bull,
-                            'finishable': is_finishable,
-                            'has_checkout': has_path,
-                        })
-                        
-                        if is_finishable:
-                            analysis['finishable_count'] += 1
-                        if has_path:
-                            analysis['has_checkout_path_count'] += 1
+    # All reachable remaining scores in one subtraction over the segment's deltas
+    deltas, by_trebles_alone = _approach_deltas(segment, darts_available)
+    reachable = deltas <= score
+    scores = score - deltas[reachable]
+    lookup_idx = np.minimum(scores, LOOKUP_SIZE - 1)
+    finishable_lookup = FINISHABLE_LOOKUP_DOUBLE if out_rule == 'double' else FINISHABLE_LOOKUP_STRAIGHT
+    finishable = finishable_lookup[lookup_idx]
+    has_path = CHECKOUT_PATH_LOOKUP[lookup_idx]
+    finishable_count = int(np.count_nonzero(finishable))
+    has_checkout_path_count = int(np.count_nonzero(has_path))
+    # 0 is an immediate finish only when a run of trebles alone reaches it before any setup dart does
+    finish_at = np.flatnonzero(deltas == score)
+    immediately_finishable = bool(finish_at.size) and bool(by_trebles_alone[finish_at[0]])
+    reachable_scores = tuple(zip(scores.tolist(), finishable.tolist(), has_path.tolist())) if need_detail else None
     
     # Find the best remaining score among reachable finish/checkouts.
-    # Prefer higher checkout leaves (closer to 170) over very low leaves.
-    reachable_checkoutish = [
-        item for item in analysis['reachable_scores']
-        if item['finishable'] or item['has_checkout']
-    ]
-    if reachable_checkoutish:
-        under_171 = [item for item in reachable_checkoutish if item['score'] <= 170]
-        preferred_pool = under_171 if under_171 else reachable_checkoutish
-        analysis['best_remaining'] = max(preferred_pool, key=lambda x: x['score'])['score']
+    # Prefer higher checkout leaves (closer to 170) over very low leaves. Both lookups are False above 170,
+    # so every finish/checkout leaf is already <= 170 and the best one is a single masked max.
+    best = int(scores.max(where=finishable | has_path, initial=-1))
+    best_remaining = best if best >= 0 else None
     
-    return analysis
+    return ApproachAnalysis(
+        segment,
+        treble_value,
+        reachable_scores,
+        finishable_count,
+        has_checkout_path_count,
+        immediately_finishable,
+        best_remaining,
+    )
+
+
+def evaluate_approach_segment(score: int, segment: int, out_rule: str = 'double', darts_available: int = 3) -> dict:
+    """
+    Evaluate how good a treble segment is for approach play.
+    Returns analysis of what remaining scores are reachable.
+    """
+    analysis = _evaluate_approach_segment(score, segment, out_rule, darts_available, need_detail=True)
+    if analysis is None:
+        return {'valid': False, 'reason': 'Invalid segment'}
+    result = analysis._asdict()
+    result['reachable_scores'] = [
+        {'score': reachable, 'finishable': finishable, 'has_checkout': has_path}
+        for reachable, finishable, has_path in analysis.reachable_scores
+    ]
+    return result
+
+
+# Deterministic overrides for specific score/dart scenarios.
+# Grouped by target so tuning is easy (e.g. all T20 starts together).
+APPROACH_T20_OVERRIDES = {
+    (215, 3),
+    (231, 3),
+    (235, 3),
+    (190, 1),
+    (171, 1),
+    (171, 3),
+    (172, 3),
+    (172, 1),
+    (175, 1),
+    (175, 3),
+    (176, 1),
+    (176, 3),
+    (177, 3),
+    (177, 1),
+    (178, 1),
+    (178, 3),
+    (180, 1),
+    (181, 1),
+    (181, 3),
+    (184, 1),
+    (184, 3),
+    (185, 3),
+    (186, 3),
+    (187, 3),
+    (187, 1),
+    (191, 3),
+    (191, 1),
+    (192, 3),
+    (193, 3),
+    (193, 1),
+    (194, 3),
+    (194, 1),
+    (196, 1),
+    (197, 1),
+    (198, 1),
+    (199, 1),
+    (199, 3),
+    (200, 1),
+    (201, 1),
+    (201, 3),
+    (202, 1),
+    (203, 1),
+    (204, 1),
+    (205, 1),
+    (206, 1),
+    (207, 1),
+    (208, 1),
+    (209, 3),
+    (210, 1),
+    (211, 1),
+    (211, 3),
+    (212, 3),
+    (213, 3),
+    (214, 1),
+    (217, 1),
+    (217, 3),
+    (219, 3),
+    (220, 1),
+    (221, 3),
+    (222, 3),
+    (223, 3),
+    (224, 3),
+    (225, 3),
+    (226, 3),
+    (227, 3),
+    (228, 3),
+    (229, 3),
+    (243, 3),
+    (244, 3),
+    (246, 3),
+    (251, 3),
+    (253, 3),
+    (257, 3),
+    (261, 3),
+    (267, 3),
+}
+APPROACH_T19_OVERRIDES = {
+    (265, 3),
+    (271, 3),
+    (173, 1),
+    (179, 1),
+    (211, 2),
+    (214, 2),
+    (219, 1),
+    (233, 3),
+    (243, 2),
+    (246, 2),
+    (249, 2),
+}
+APPROACH_T18_OVERRIDES = {
+    (174, 1),
+    (213, 2),
+    (242, 2),
+    (245, 2),
+    (248, 2),
+}
+
+# Merged into one table keyed by (score, darts_available) -> segment.
+# T20 is written last so it wins if a key is ever listed under more than one target.
+APPROACH_OVERRIDES = {}
+for _segment, _overrides in ((18, APPROACH_T18_OVERRIDES), (19, APPROACH_T19_OVERRIDES), (20, APPROACH_T20_OVERRIDES)):
+    for _key in _overrides:
+        APPROACH_OVERRIDES[_key] = _segment
+del _segment, _overrides, _key
 
 
 def find_best_approach_segment(score: int, out_rule: str = 'double', darts_available: int = 3) -> dict:
@@ -194,136 +327,14 @@ def find_best_approach_segment(score: int, out_rule: str = 'double', darts_avail
     Compares all trebles (1-20) and picks the one that leaves the best finishing positions.
     Returns {'segment': int, 'reason': str, 'alternatives': [...]}
     """
-    preferred_treble_segments = [20, 19, 18, 17]
-    preferred_single_segments = [20, 19, 18, 17, 25, 50]
+    # results are memoised per (score, out_rule, darts_available); hand out a copy so callers can't alter the cache
+    return copy.deepcopy(_find_best_approach_segment(score, out_rule, darts_available))
 
-    # Deterministic overrides for specific score/dart scenarios.
-    # Grouped by target so tuning is easy (e.g. all T20 starts together).
-    t20_overrides = {
-        (215, 3),
-        (231, 3),
-        (235, 3),
-        (190, 1),
-        (171, 1),
-        (171, 3),
-        (172, 3),
-        (172, 1),
-        (175, 1),
-        (175, 3),
-        (176, 1),
-        (176, 3),
-        (177, 3),
-        (177, 1),
-        (178, 1),
-        (178, 3),
-        (180, 1),
-        (181, 1),
-        (181, 3),
-        (184, 1),
-        (184, 3),
-        (185, 3),
-        (186, 3),
-        (187, 3),
-        (187, 1),
-        (191, 3),
-        (191, 1),
-        (192, 3),
-        (193, 3),
-        (193, 1),
-        (194, 3),
-        (194, 1),
-        (196, 1),
-        (197, 1),
-        (198, 1),
-        (199, 1),
-        (199, 3),
-        (200, 1),
-        (201, 1),
-        (201, 3),
-        (202, 1),
-        (203, 1),
-        (204, 1),
-        (205, 1),
-        (206, 1),
-        (207, 1),
-        (208, 1),
-        (209, 3),
-        (210, 1),
-        (211, 1),
-        (211, 3),
-        (212, 3),
-        (213, 3),
-        (214, 1),
-        (217, 1),
-        (217, 3),
-        (219, 3),
-        (220, 1),
-        (221, 3),
-        (222, 3),
-        (223, 3),
-        (224, 3),
-        (225, 3),
-        (226, 3),
-        (227, 3),
-        (228, 3),
-        (229, 3),
-        (243, 3),
-        (244, 3),
-        (246, 3),
-        (251, 3),
-        (253, 3),
-        (257, 3),
-        (261, 3),
-        (267, 3),
-    }
-    t19_overrides = {
-        (265, 3),
-        (271, 3),
-        (173, 1),
-        (179, 1),
-        (211, 2),
-        (214, 2),
-        (219, 1),
-        (233, 3),
-        (243, 2),
-        (246, 2),
-        (249, 2),
-    }
-    t18_overrides = {
-        (174, 1),
-        (213, 2),
-        (242, 2),
-        (245, 2),
-        (248, 2),
-    }
-
-    override_key = (score, darts_available)
-    override_target = None
-    if override_key in t20_overrides:
-        override_target = 't20'
-    elif override_key in t19_overrides:
-        override_target = 't19'
-    elif override_key in t18_overrides:
-        override_target = 't18'
 
-    if override_target and 171 <= score <= 271:
-        segment = 20
-        if len(override_target) > 1 and override_target[1:].isdigit():
-            segment = int(override_target[1:])
-
-        return {
-            'segment': segment,
-            'target': override_target,
-            'reason': f"Override profile: start on {override_target.upper()} for score {score} with {darts_available} darts",
-            'approach_play': True,
-            'alternatives': [
-                {'segment': 20, 'target': 't20', 'quality': 0},
-                {'segment': 19, 'target': 't19', 'quality': 0},
-                {'segment': 18, 'target': 't18', 'quality': 0},
-                {'segment': 17, 'target': 't17', 'quality': 0},
-                {'segment': 25, 'target': 's25', 'quality': 0},
-            ],
-        }
+@functools.lru_cache(maxsize=4096)
+def _find_best_approach_segment(score: int, out_rule: str = 'double', darts_available: int = 3) -> dict:
+    preferred_treble_segments = [20, 19, 18, 17]
+    preferred_single_segments = [20, 19, 18, 17, 25, 50]
 
     if score <= 170:
         # Score is already in checkout range, no approach play needed
@@ -351,6 +362,24 @@ def find_best_approach_segment(score: int, out_rule: str = 'double', darts_avail
             ],
         }
 
+    # Overrides only cover 171-271, so they're checked after the range exits above
+    segment = APPROACH_OVERRIDES.get((score, darts_available))
+    if segment is not None:
+        override_target = f"t{segment}"
+        return {
+            'segment': segment,
+            'target': override_target,
+            'reason': f"Override profile: start on {override_target.upper()} for score {score} with {darts_available} darts",
+            'approach_play': True,
+            'alternatives': [
+                {'segment': 20, 'target': 't20', 'quality': 0},
+                {'segment': 19, 'target': 't19', 'quality': 0},
+                {'segment': 18, 'target': 't18', 'quality': 0},
+                {'segment': 17, 'target': 't17', 'quality': 0},
+                {'segment': 25, 'target': 's25', 'quality': 0},
+            ],
+        }
+
     # With one dart left, prioritize leaving the highest reachable checkout score
     # using practical setup singles from 20/19/18/17/25/50.
     if darts_available <= 1:
@@ -393,14 +422,14 @@ def find_best_approach_segment(score: int, out_rule: str = 'double', darts_avail
     # Evaluate preferred treble segments for strategic setup.
     evaluations = []
     for segment in preferred_treble_segments:
-        analysis = evaluate_approach_segment(score, segment, out_rule, darts_available)
+        analysis = _evaluate_approach_segment(score, segment, out_rule, darts_available)
 
         # Score segment quality with setup-first priorities.
         quality_score = (
-            (120 if analysis['immediately_finishable'] else 0) +
-            (analysis['finishable_count'] * 12) +
-            (analysis['has_checkout_path_count'] * 8) +
-            (20 if analysis['best_remaining'] is not None and analysis['best_remaining'] <= 170 else 0)
+            (120 if analysis.immediately_finishable else 0) +
+            (analysis.finishable_count * 12) +
+            (analysis.has_checkout_path_count * 8) +
+            (20 if analysis.best_remaining is not None and analysis.best_remaining <= 170 else 0)
         )
 
         # Encourage high scoring when setup value is tied.
@@ -417,24 +446,24 @@ def find_best_approach_segment(score: int, out_rule: str = 'double', darts_avail
     best = evaluations[0]
 
     treble_hit_leave = score - (best['segment'] * 3)
-    if best['analysis']['immediately_finishable']:
+    if best['analysis'].immediately_finishable:
         reason = f"{best['target'].upper()} can reach 0 (immediate finish)"
-    elif best['analysis']['best_remaining'] is not None and best['analysis']['best_remaining'] <= 170:
+    elif best['analysis'].best_remaining is not None and best['analysis'].best_remaining <= 170:
         if treble_hit_leave >= 2:
             reason = (
                 f"{best['target'].upper()} leaves {treble_hit_leave} on treble hit "
-                f"(best setup leave {best['analysis']['best_remaining']})"
+                f"(best setup leave {best['analysis'].best_remaining})"
             )
         else:
-            reason = f"{best['target'].upper()} leaves {best['analysis']['best_remaining']} (checkout available)"
-    elif best['analysis']['best_remaining'] is not None:
+            reason = f"{best['target'].upper()} leaves {best['analysis'].best_remaining} (checkout available)"
+    elif best['analysis'].best_remaining is not None:
         if treble_hit_leave >= 2:
             reason = (
                 f"{best['target'].upper()} leaves {treble_hit_leave} on treble hit "
-                f"(best setup leave {best['analysis']['best_remaining']})"
+                f"(best setup leave {best['analysis'].best_remaining})"
             )
         else:
-            reason = f"{best['target'].upper()} leaves {best['analysis']['best_remaining']}"
+            reason = f"{best['target'].upper()} leaves {best['analysis'].best_remaining}"
     else:
         if treble_hit_leave >= 2:
             reason = f"{best['target'].upper()} leaves {treble_hit_leave} on treble hit"
@@ -456,102 +485,159 @@ def find_best_approach_segment(score: int, out_rule: str = 'double', darts_avail
         ]
     }
 
+def approach_entry(result: dict):
+    """Return (log summary, serialised body) for an approach suggestion."""
+    target = result.get('target', f"t{result['segment']}")
+    return f"{target.upper()} - {result['reason']}", orjson.dumps(result)
+
+# Approach suggestions for every realistic request, serialised once at startup so the endpoint is a lookup.
+# Anything outside the table falls back to find_best_approach_segment.
+APPROACH_OUT_RULES = ('double', 'straight')
+APPROACH_MAX_SCORE = 501
+APPROACH_TABLE = {
+    (score, out_rule, darts_available): approach_entry(_find_best_approach_segment(score, out_rule, darts_available))
+    for score in range(2, APPROACH_MAX_SCORE + 1)
+    for out_rule in APPROACH_OUT_RULES
+    for darts_available in (1, 2, 3)
+}
+
+# A serialised response body, its ETag, and a gzip copy of it (None for small bodies)
+PrebuiltJSON = namedtuple('PrebuiltJSON', ['body', 'etag', 'gzip_body'])
+GZIP_MIN_BYTES = 1024  # smaller bodies aren't worth compressing
+
+
+def prebuild_body(body: bytes) -> PrebuiltJSON:
+    gzip_body = gzip.compress(body, compresslevel=6) if len(body) >= GZIP_MIN_BYTES else None
+    return PrebuiltJSON(body, hashlib.sha1(body).hexdigest(), gzip_body)
+
+
+def prebuild_json(obj) -> PrebuiltJSON:
+    # Serialise (and compress) a response body once, with an ETag so clients can revalidate with a 304
+    return prebuild_body(orjson.dumps(obj))
+
+
+@functools.lru_cache(maxsize=1)
+def prebuild_file(path: str, mtime_ns: int, size: int) -> PrebuiltJSON:
+    # Keyed on the file's mtime and size so a regenerated file is picked up
+    with open(path, 'rb') as fh:
+        return prebuild_body(fh.read())
+
+
+def prebuilt_response(prebuilt: PrebuiltJSON):
+    # Serve the precompressed copy to clients that accept gzip
+    if prebuilt.gzip_body is not None and request.accept_encodings['gzip']:
+        response = app.response_class(prebuilt.gzip_body, mimetype='application/json')
+        response.headers['Content-Encoding'] = 'gzip'
+        response.set_etag(prebuilt.etag + '-gzip')
+    else:
+        response = app.response_class(prebuilt.body, mimetype='application/json')
+        response.set_etag(prebuilt.etag)
+    if prebuilt.gzip_body is not None:
+        response.vary.add('Accept-Encoding')
+    return response.make_conditional(request)
+
+
+# The data behind the GET endpoints never changes while the process runs, so their bodies are built once
+HEALTH_RESPONSE = prebuild_json({
+    'status': 'ok',
+    'has_data': bool(checkout_data.get('bins')),
+    'message': 'Dartbot API is running'
+})
+ROOT_RESPONSE = prebuild_json({
+    'name': 'Dartbot API',
+    'version': '1.0',
+    'endpoints': {
+        'GET /api/health': 'Health check',
+        'GET /api/checkout/bins': 'List available average bins',
+        'GET /api/double/outcomes': 'Get double_outcomes.json data',
+        'GET /api/simulation/results': 'Get simulation_results.json data',
+        'POST /api/checkout/recommend': 'Get checkout recommendation (score, average)',
+        'POST /api/bot/strategy': 'Get bot throw strategy based on level and current score'
+    }
+})
+BINS_RESPONSE = prebuild_json({
+    'bins': list(AVAILABLE_BINS),
+    'count': len(AVAILABLE_BINS)
+}) if AVAILABLE_BINS else None
+
+
+def load_prebuilt_json(path: str, label: str):
+    # Read a data file that is only ever served back whole and keep just its prebuilt body (None if missing or empty)
+    try:
+        with open(path, 'rb') as fh:
+            data = orjson.loads(fh.read())
+        print(f"Loaded {label} from {path}")
+    except Exception as e:
+        print(f"Warning: Could not load {label}: {e}")
+        return None
+    return prebuild_json(data) if data else None
+
+# Loaded at import so that under gunicorn's preload_app the master builds it once and the workers share it
+DOUBLE_OUTCOMES_RESPONSE = load_prebuilt_json(DOUBLE_OUTCOMES_JSON, 'double outcomes data')
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    has_data = bool(checkout_data.get('bins'))
-    return jsonify({
-        'status': 'ok',
-        'has_data': has_data,
-        'message': 'Dartbot API is running'
-    }), 200
+    return prebuilt_response(HEALTH_RESPONSE)
 
 @app.route('/', methods=['GET'])
 def root():
     """Root endpoint with API info"""
-    return jsonify({
-        'name': 'Dartbot API',
-        'version': '1.0',
-        'endpoints': {
-            'GET /api/health': 'Health check',
-            'GET /api/checkout/bins': 'List available average bins',
-            'GET /api/double/outcomes': 'Get double_outcomes.json data',
-            'GET /api/simulation/results': 'Get simulation_results.json data',
-            'POST /api/checkout/recommend': 'Get checkout recommendation (score, average)',
-            'POST /api/bot/strategy': 'Get bot throw strategy based on level and current score'
-        }
-    }), 200
+    return prebuilt_response(ROOT_RESPONSE)
 
 @app.route('/api/checkout/bins', methods=['GET'])
 def get_checkout_bins():
     """List all available checkout average bins"""
-    if not checkout_data.get('bins'):
-        return jsonify({'error': 'No checkout data available'}), 404
+    if BINS_RESPONSE is None:
+        return ojsonify({'error': 'No checkout data available'}, 404)
     
-    bins = list(checkout_data['bins'].keys())
-    return jsonify({
-        'bins': bins,
-        'count': len(bins)
-    }), 200
+    return prebuilt_response(BINS_RESPONSE)
 
 @app.route('/api/simulation/results', methods=['GET'])
 def get_simulation_results():
     """Return simulation_results.json contents"""
-    if not simulation_results_data:
-        print("[API] simulation_results_data is empty")
-        return jsonify({'error': 'No simulation results data available'}), 404
-    
+    # The file is served as-is: no parse or re-serialise. Clients that accept gzip get a compressed copy
+    # cached until the file changes; others get sendfile where the server supports it. Conditional
+    # requests (If-None-Match / If-Modified-Since / Range) are handled by Werkzeug either way.
     try:
-        response = jsonify(simulation_results_data)
-        response.headers['Access-Control-Allow-Origin'] = '*'
-        data_size = len(str(simulation_results_data))
-        print(f"[API] Returning simulation results: {data_size} bytes")
-        return response, 200
-    except Exception as e:
-        print(f"[API] Error returning simulation results: {e}")
-        return jsonify({'error': str(e)}), 500
+        if request.accept_encodings['gzip']:
+            st = os.stat(SIMULATION_RESULTS_JSON)
+            response = prebuilt_response(prebuild_file(SIMULATION_RESULTS_JSON, st.st_mtime_ns, st.st_size))
+        else:
+            response = send_file(SIMULATION_RESULTS_JSON, mimetype='application/json', conditional=True)
+    except FileNotFoundError:
+        print("[API] simulation_results.json not found")
+        return ojsonify({'error': 'No simulation results data available'}, 404)
+    
+    # Same policy for both encodings: no max-age, clients revalidate with the ETag
+    response.cache_control.no_cache = True
+    response.headers['Access-Control-Allow-Origin'] = '*'
+    print(f"[API] Returning simulation results: {response.content_length} bytes")
+    return response
 
 @app.route('/api/double/outcomes', methods=['GET'])
 def get_double_outcomes():
     """Return double_outcomes.json contents"""
-    if not double_outcomes_data:
+    if DOUBLE_OUTCOMES_RESPONSE is None:
         print("[API] double_outcomes_data is empty")
-        return jsonify({'error': 'No double outcomes data available'}), 404
+        return ojsonify({'error': 'No double outcomes data available'}, 404)
     
-    try:
-        response = jsonify(double_outcomes_data)
-        response.headers['Access-Control-Allow-Origin'] = '*'
-        data_size = len(str(double_outcomes_data))
-        print(f"[API] Returning double outcomes: {data_size} bytes")
-        return response, 200
-    except Exception as e:
-        print(f"[API] Error returning double outcomes: {e}")
-        return jsonify({'error': str(e)}), 500
+    response = prebuilt_response(DOUBLE_OUTCOMES_RESPONSE)
+    response.headers['Access-Control-Allow-Origin'] = '*'
+    print(f"[API] Returning double outcomes: {response.content_length} bytes")
+    return response
 
-@app.route('/api/checkout/recommend', methods=['POST'])
-def get_checkout_recommendation():
-    # Get checkout recommendation for a given score and average range
-    data = request.get_json()
-    
-    if not data:
-        return jsonify({'error': 'No JSON body provided'}), 400
-    
-    score = data.get('score')
-    average_range = data.get('average_range', '30-39')
-    
-    if score is None:
-        return jsonify({'error': 'Score is required'}), 400
-    
-    if not isinstance(score, int) or score < 2 or score > 170:
-        return jsonify({'error': 'Score must be an integer between 2 and 170'}), 400
-    
+def checkout_recommendation_response(score: int, average_range):
+    """
+    (log lines, prebuilt body) for a validated /api/checkout/recommend (score, average_range).
+    The answer only depends on data loaded at startup, so string ranges are served through
+    cached_checkout_recommendation_response; the handler prints the log lines on every request.
+    """
     # First try to get from checkout candidates (optimal routes)
-    score_str = str(score)
-    if score_str in checkout_candidates:
-        candidates = checkout_candidates[score_str]
+    if score in checkout_candidates:
+        candidates = checkout_candidates[score]
         best_sequence = candidates[0] if candidates else None
-        print(f"[API] Found {len(candidates)} checkout candidates for {score}, best={best_sequence}")
-        return jsonify({
+        return (f"Found {len(candidates)} checkout candidates for {score}, best={best_sequence}",), prebuild_json({
             'score': score,
             'average_range': average_range,
             'recommendation': {
@@ -560,33 +646,58 @@ def get_checkout_recommendation():
                 },
                 'all_candidates': candidates
             }
-        }), 200
+        })
     
-    print(f"[API] No checkout candidate found for {score}, falling back to old format")
+    log = (f"No checkout candidate found for {score}, falling back to old format",)
     
     # Fallback to old data format if available
-    try:
-        bins = checkout_data.get('bins', {})
-        bin_data = bins.get(average_range, {})
-        
-        if score_str not in bin_data:
-            print(f"[API] No bin data for {score} in range {average_range}")
-            return jsonify({
-                'score': score,
-                'average_range': average_range,
-                'recommendation': None,
-                'message': f'No checkout data available for score {score}'
-            }), 200
-        
-        recommendation = bin_data[score_str]
-        return jsonify({
+    recommendation = BIN_INDEX.get((average_range, score))
+    
+    if recommendation is None:
+        return log + (f"No bin data for {score} in range {average_range}",), prebuild_json({
             'score': score,
             'average_range': average_range,
-            'recommendation': recommendation
-        }), 200
+            'recommendation': None,
+            'message': f'No checkout data available for score {score}'
+        })
+    
+    return log, prebuild_json({
+        'score': score,
+        'average_range': average_range,
+        'recommendation': recommendation
+    })
+
+cached_checkout_recommendation_response = functools.lru_cache(maxsize=4096)(checkout_recommendation_response)
+
+@app.route('/api/checkout/recommend', methods=['POST'])
+def get_checkout_recommendation():
+    # Get checkout recommendation for a given score and average range
+    data = request_json()
+    
+    if not data:
+        return ojsonify({'error': 'No JSON body provided'}, 400)
+    
+    score = data.get('score')
+    average_range = data.get('average_range', '30-39')
+    
+    if score is None:
+        return ojsonify({'error': 'Score is required'}, 400)
+    
+    if not isinstance(score, int) or score < 2 or score > 170:
+        return ojsonify({'error': 'Score must be an integer between 2 and 170'}, 400)
+    
+    try:
+        if isinstance(average_range, str):
+            log, prebuilt = cached_checkout_recommendation_response(score, average_range)
+        else:
+            # other JSON values may not be hashable, so they are answered without the cache
+            log, prebuilt = checkout_recommendation_response(score, average_range)
+        for line in log:
+            print(f"[API] {line}")
+        return prebuilt_response(prebuilt)
     except Exception as e:
         print(f"[API] Error getting checkout recommendation: {e}")
-        return jsonify({'error': str(e)}), 500
+        return ojsonify({'error': str(e)}, 500)
 
 @app.route('/api/approach/suggest', methods=['POST'])
 def suggest_approach_segment():
@@ -594,40 +705,47 @@ def suggest_approach_segment():
     Suggest the best starting segment for approach play on high scores (>170).
     Analyzes all treble segments and finds which leaves the best finishing positions.
     """
-    data = request.get_json()
+    data = request_json()
     
     if not data:
-        return jsonify({'error': 'No JSON body provided'}), 400
+        return ojsonify({'error': 'No JSON body provided'}, 400)
     
     score = data.get('score')
     out_rule = data.get('out_rule', 'double')
     darts_available = data.get('darts_available', 3)
     
     if score is None:
-        return jsonify({'error': 'Score is required'}), 400
+        return ojsonify({'error': 'Score is required'}, 400)
     
     if not isinstance(score, int) or score < 2:
-        return jsonify({'error': 'Score must be an integer >= 2'}), 400
+        return ojsonify({'error': 'Score must be an integer >= 2'}, 400)
 
     if not isinstance(darts_available, int) or darts_available < 1 or darts_available > 3:
-        return jsonify({'error': 'darts_available must be an integer between 1 and 3'}), 400
+        return ojsonify({'error': 'darts_available must be an integer between 1 and 3'}, 400)
+
+    if not isinstance(out_rule, str):
+        # Only out_rule == 'double' changes the answer, so any other JSON value is played as
+        # straight-out, exactly as the uncached path would (and lists/dicts can't be cache keys)
+        out_rule = 'straight'
     
     try:
-        result = find_best_approach_segment(score, out_rule, darts_available)
-        target_for_log = result.get('target', f"t{result['segment']}")
-        print(f"[API] Approach suggestion for {score} ({darts_available} darts): {target_for_log.upper()} - {result['reason']}")
-        return jsonify(result), 200
+        entry = APPROACH_TABLE.get((score, out_rule, darts_available))
+        if entry is None:
+            entry = approach_entry(_find_best_approach_segment(score, out_rule, darts_available))
+        summary, body = entry
+        print(f"[API] Approach suggestion for {score} ({darts_available} darts): {summary}")
+        return app.response_class(body, 200, mimetype='application/json')
     except Exception as e:
         print(f"[API] Error getting approach suggestion: {e}")
-        return jsonify({'error': str(e)}), 500
+        return ojsonify({'error': str(e)}, 500)
 
 @app.route('/api/bot/strategy', methods=['POST'])
 def get_bot_strategy():
     # Get bot throw strategy based on level and current score
-    data = request.get_json()
+    data = request_json()
     
     if not data:
-        return jsonify({'error': 'No JSON body provided'}), 400
+        return ojsonify({'error': 'No JSON body provided'}, 400)
     
     level = data.get('level', 10)
     current_score = data.get('current_score')
@@ -635,36 +753,34 @@ def get_bot_strategy():
     average_range = data.get('average_range', '30-39')
     
     if current_score is None:
-        return jsonify({'error': 'current_score is required'}), 400
+        return ojsonify({'error': 'current_score is required'}, 400)
     
     # Bot strategy based on level and score
     # Level 1-18 maps to mean score: 44-112 (approximately)
     mean_score = 40 + level * 4
     
     # Check if we can finish (using checkout data)
-    checkout_eligible = [2, 170]  # Score range for checkouts
-    impossible_checkouts = IMPOSSIBLE_CHECKOUT_SCORES
-    
-    can_attempt_checkout = (
-        current_score >= checkout_eligible[0] and 
-        current_score <= checkout_eligible[1] and 
-        current_score not in impossible_checkouts and
-        (out_rule != 'double' or current_score % 2 == 0)
-    )
+    if type(current_score) is int:
+        can_attempt_checkout = current_score in (
+            CHECKOUT_ATTEMPT_SCORES_DOUBLE if out_rule == 'double' else CHECKOUT_ATTEMPT_SCORES_STRAIGHT
+        )
+    else:
+        # Anything else (floats, bools, ...) goes through the original comparisons, which the
+        # precomputed int sets don't reproduce for non-integer values
+        can_attempt_checkout = (
+            2 <= current_score <= 170 and
+            current_score not in IMPOSSIBLE_CHECKOUT_SCORES and
+            (out_rule != 'double' or current_score % 2 == 0)
+        )
     
-    # Get recommended checkout if available
+    # Get recommended checkout if available (bins are keyed by integer score, so only ints can match)
     checkout_rec = None
-    if can_attempt_checkout:
-        try:
-            bins = checkout_data.get('bins', {})
-            bin_data = bins.get(average_range, {})
-            score_str = str(current_score)
-            if score_str in bin_data:
-                checkout_rec = bin_data[score_str].get('best', {})
-        except Exception:
-            pass
+    if can_attempt_checkout and type(current_score) is int and isinstance(average_range, str):
+        recommendation = BIN_INDEX.get((average_range, current_score))
+        if recommendation is not None:
+            checkout_rec = recommendation.get('best', {})
     
-    return jsonify({
+    return ojsonify({
         'level': level,
         'current_score': current_score,
         'out_rule': out_rule,
@@ -676,7 +792,7 @@ def get_bot_strategy():
             'target_mean': mean_score,
             'is_finishing': current_score == mean_score and can_attempt_checkout
         }
-    }), 200
+    }, 200)
 
 
 if __name__ == '__main__':
@@ -687,4 +803,6 @@ if __name__ == '__main__':
     print("  POST /api/checkout/recommend - Get checkout recommendation")
     print("  POST /api/bot/strategy - Get bot strategy")
     print("\nListening on http://0.0.0.0:8000")
-    app.run(host='0.0.0.0', port=8000, debug=True)
+    # debugger and reloader are opt-in (DARTBOT_DEBUG=1); they add per-request overhead
+    debug = os.getenv('DARTBOT_DEBUG') == '1'
+    app.run(host='0.0.0.0', port=8000, debug=debug, use_reloader=debug, threaded=True)
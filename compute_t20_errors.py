@@ -1,6 +1,8 @@
 import os
-import csv
-from collections import defaultdict
+
+import pandas as pd
+
+from dartbot_core import CommentFilter
 
 script_dir = os.path.dirname(os.path.abspath(__file__))
 folder = os.path.join(script_dir, 'T20_Datasets')
@@ -10,33 +12,23 @@ csv_files = [f for f in os.listdir(folder) if f.lower().endswith('.csv')]
 
 for fname in sorted(csv_files):
     path = os.path.join(folder, fname)
-    total = 0
-    misses = 0
-    miss_beds = defaultdict(int)
-    rows = []
     try:
+        # one pandas pass per file ('//' comment lines dropped on the way in); the counting below runs in C
         with open(path, newline='', encoding='utf-8') as fh:
-            reader = csv.DictReader(fh)
-            # ensure required columns exist
-            if not all(col in reader.fieldnames for col in ['aimedat', 'bed', 'average']):
-                print(f"Skipping {fname}: missing required column(s)")
-                continue
-            # Get average from first row (they're all the same in the file)
-            average = None
-            for row in reader:
-                average = float(row['average'])
-                break
-            fh.seek(0)  # Reset to start of file
-            next(reader)  # Skip header row
-            for i, row in enumerate(reader, start=1):
-                aimedat = (row.get('aimedat') or '').strip().lower()
-                bed = (row.get('bed') or '').strip()
-                if aimedat == 't20':
-                    total += 1
-                    if bed.lower() != 't20':
-                        misses += 1
-                        miss_beds[bed] += 1
-                        rows.append({'line': i+1, 'bed': bed})
+            df = pd.read_csv(CommentFilter(fh), dtype=str, keep_default_na=False).fillna('')
+        # ensure required columns exist
+        if not all(col in df.columns for col in ['aimedat', 'bed', 'average']):
+            print(f"Skipping {fname}: missing required column(s)")
+            continue
+        # Get average from first row (they're all the same in the file); a blank or bad value skips the file
+        average = float(df['average'].iloc[0]) if len(df) else None
+        aimed_t20 = df['aimedat'].str.strip().str.lower() == 't20'
+        beds = df.loc[aimed_t20, 'bed'].str.strip()
+        # miss beds keep their case as written in the file
+        missed = beds[beds.str.lower() != 't20']
+        total = int(aimed_t20.sum())
+        misses = len(missed)
+        miss_beds = {bed: int(cnt) for bed, cnt in missed.value_counts(sort=False).items()}
     except Exception as e:
         print(f"Error reading {fname}: {e}")
         continue
@@ -48,7 +40,7 @@ for fname in sorted(csv_files):
         'total_aimed_t20': total,
         'misses_when_aimed_t20': misses,
         'error_rate': error_rate,
-        'miss_bed_counts': dict(miss_beds)
+        'miss_bed_counts': miss_beds
     }
 
 # Print a concise table to stdout
@@ -0,0 +1,213 @@
+"""
+Shared dataset loading and model fitting for the Dartbot simulation scripts
+Used by Initial_Model.py and simulate_checkouts.py so the CSV ingest and T20 regression live in one place
+"""
+import os
+import pickle
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+FOLDER = os.path.dirname(os.path.abspath(__file__))
+DATASET_CACHE = os.path.join(FOLDER, 'datasets_cache.pkl')  # parsed records keyed by (path, size, mtime)
+DATASET_CACHE_VERSION = 5  # bump when load_one's parsing changes so old caches are discarded
+REQUIRED_COLS = ('aimedat', 'bed', 'average')
+CSV_CHUNK_ROWS = 100_000  # rows per chunk when streaming dataset CSVs
+
+# One parsed dataset file: the player's average and how often each (aimedat, bed) pair occurred
+Record = namedtuple('Record', ['fname', 'average', 'pair_counts'])
+
+
+def _normalised_codes(col: pd.Series):
+    """
+    Strip and lowercase a categorical column by rewriting its few categories rather than every row.
+    Returns (labels, codes) where labels[codes[i]] is the normalised value of row i.
+    """
+    categories = col.cat.categories.astype(str).str.strip().str.lower().to_numpy()
+    labels, remap = np.unique(categories, return_inverse=True)
+    return labels, remap[col.cat.codes.to_numpy()]
+
+
+class CommentFilter:
+    """
+    Read-only file wrapper that drops blank lines and lines starting with '//' as pandas reads it.
+    Unlike read_csv(comment=...), a '/' inside a field is left alone.
+    """
+    def __init__(self, fh):
+        self._lines = (ln for ln in fh if ln.strip() and not ln.lstrip().startswith('//'))
+        self._pending = ''
+
+    def read(self, size: int = -1) -> str:
+        if size is None or size < 0:
+            out = self._pending + ''.join(self._lines)
+            self._pending = ''
+            return out
+        parts = [self._pending]
+        have = len(self._pending)
+        for ln in self._lines:
+            parts.append(ln)
+            have += len(ln)
+            if have >= size:
+                break
+        buf = ''.join(parts)
+        self._pending = buf[size:]
+        return buf[:size]
+
+
+def load_one(path: str):
+    """
+    Parse one dataset CSV into a Record, or None if the file should be skipped.
+    '//' comment lines are dropped as the file is streamed through the parser in chunks,
+    so only the running pair counts are held in memory.
+    """
+    fname = os.path.basename(path)
+    try:
+        try:
+            with open(path, encoding='utf-8', newline='') as fh:
+                header = pd.read_csv(CommentFilter(fh), nrows=0).columns
+        except pd.errors.EmptyDataError:
+            print(f"Skipping {fname}: no CSV content after filtering comments")
+            return None
+        if not all(col in header for col in REQUIRED_COLS):
+            print(f"Skipping {fname}: missing required column(s) (need aimedat, bed, average)")
+            return None
+        avg = None
+        has_rows = False
+        pair_counts = Counter()
+        with open(path, encoding='utf-8', newline='') as fh, pd.read_csv(
+            CommentFilter(fh),
+            usecols=list(REQUIRED_COLS),
+            dtype={'aimedat': 'category', 'bed': 'category', 'average': str},
+            keep_default_na=False,
+            chunksize=CSV_CHUNK_ROWS,
+        ) as reader:
+            for chunk in reader:
+                if chunk.empty:
+                    continue
+                if not has_rows:
+                    has_rows = True
+                    # average is only filled in on the first row of each file
+                    try:
+                        avg = float(chunk['average'].iloc[0] or 0.0)
+                    except Exception:
+                        avg = None
+                aim_labels, aim_codes = _normalised_codes(chunk['aimedat'])
+                bed_labels, bed_codes = _normalised_codes(chunk['bed'])
+                # tally every (aimedat, bed) pair in one pass over integer pair codes
+                n_beds = len(bed_labels)
+                pair_codes = aim_codes * n_beds + bed_codes
+                counts = np.bincount(pair_codes, minlength=len(aim_labels) * n_beds)
+                # insert pairs in order of first appearance, as a row-by-row tally would, so the
+                # callers' Counters (and the float sums taken over them) keep the file's order
+                seen, first_row = np.unique(pair_codes, return_index=True)
+                for code in seen[np.argsort(first_row)]:
+                    aimed = str(aim_labels[code // n_beds])
+                    if aimed:
+                        pair_counts[(aimed, str(bed_labels[code % n_beds]))] += int(counts[code])
+        if not has_rows:
+            return None
+        return Record(fname, avg, pair_counts)
+    except Exception as e:
+        print(f"Error reading {fname}: {e}")
+        return None
+
+
+def _load_cache(cache_path: str) -> dict:
+    try:
+        with open(cache_path, 'rb') as fh:
+            cache = pickle.load(fh)
+        if not isinstance(cache, dict) or cache.get('version') != DATASET_CACHE_VERSION:
+            return {}
+        return cache['records']
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        print(f"Warning: ignoring unreadable dataset cache {cache_path}: {e}")
+        return {}
+
+
+def _save_cache(cache_path: str, cache: dict):
+    # write to a temp file and swap it in so an interrupted run never leaves a truncated cache
+    tmp_path = cache_path + '.tmp'
+    try:
+        with open(tmp_path, 'wb') as fh:
+            pickle.dump({'version': DATASET_CACHE_VERSION, 'records': cache}, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except Exception as e:
+        print(f"Warning: could not write dataset cache {cache_path}: {e}")
+
+
+def load_records(folder: str, cache_path: str = DATASET_CACHE) -> list:
+    """
+    Load every dataset CSV in folder, in sorted file order.
+    Files whose (path, size, mtime) match the on-disk cache are reused without reparsing;
+    the rest are parsed concurrently (pandas' C parser releases the GIL so threads overlap the parsing).
+    Pass cache_path=None to always reparse.
+    """
+    # one directory scan; DirEntry carries the path and caches its stat() result
+    with os.scandir(folder) as it:
+        entries = sorted((e for e in it if e.name.lower().endswith('.csv')), key=lambda e: e.name)
+    paths = [e.path for e in entries]
+    keys = []
+    for e in entries:
+        st = e.stat()
+        keys.append((os.path.abspath(e.path), st.st_size, st.st_mtime_ns))
+
+    cache = _load_cache(cache_path) if cache_path else {}
+    stale = [(key, path) for key, path in zip(keys, paths) if key not in cache]
+    if stale:
+        with ThreadPoolExecutor() as ex:
+            parsed = list(ex.map(load_one, [path for _, path in stale]))
+        for (key, _), record in zip(stale, parsed):
+            cache[key] = record
+        if cache_path:
+            # keep entries for other folders, drop outdated versions of files in this one
+            current = set(keys)
+            folder_prefix = os.path.join(os.path.abspath(folder), '')
+            cache = {k: v for k, v in cache.items() if k in current or not k[0].startswith(folder_prefix)}
+            _save_cache(cache_path, cache)
+
+    return [cache[key] for key in keys if cache[key] is not None]
+
+
+def t20_counts(record: Record):
+    """Return (aimed, hits, miss_beds) for darts aimed at T20 in a record."""
+    aimed = 0
+    hits = 0
+    miss_beds = Counter()
+    for (aimedat, bed), cnt in record.pair_counts.items():
+        if aimedat != 't20':
+            continue
+        aimed += cnt
+        if bed == 't20':
+            hits += cnt
+        else:
+            miss_beds[bed] += cnt
+    return aimed, hits, miss_beds
+
+
+def fit_weighted_linear(data_points):
+    """
+    Weighted least-squares fit of y on x for (x, y, weight) points.
+    Returns (slope, intercept, r2), or (None, None, None) with fewer than 2 points.
+    """
+    if len(data_points) < 2:
+        return None, None, None
+    xs = np.fromiter((d[0] for d in data_points), dtype=float, count=len(data_points))
+    ys = np.fromiter((d[1] for d in data_points), dtype=float, count=len(data_points))
+    ws = np.fromiter((d[2] for d in data_points), dtype=float, count=len(data_points))
+    W = ws.sum()
+    mean_x = np.dot(ws, xs) / W
+    mean_y = np.dot(ws, ys) / W
+    dx = xs - mean_x
+    dy = ys - mean_y
+    cov_xy = np.einsum('i,i,i->', ws, dx, dy) / W
+    var_x = np.einsum('i,i,i->', ws, dx, dx) / W
+    slope = float(cov_xy / var_x) if var_x != 0 else 0.0
+    intercept = float(mean_y - slope * mean_x)
+    ss_tot = np.dot(ws, dy * dy)
+    ss_res = np.dot(ws, (ys - (slope * xs + intercept)) ** 2)
+    r2 = float(1.0 - ss_res / ss_tot) if ss_tot != 0 else None
+    return slope, intercept, r2
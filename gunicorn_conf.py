@@ -0,0 +1,22 @@
+"""
+Gunicorn settings for the Dartbot API (gunicorn -c gunicorn_conf.py wsgi:app)
+"""
+import gc
+import multiprocessing
+import os
+
+bind = os.getenv('DARTBOT_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('DARTBOT_WORKERS', multiprocessing.cpu_count()))
+# Handlers only read the shared tables and mostly return pre-serialised bytes, so each worker
+# can serve several requests at once on threads
+worker_class = 'gthread'
+threads = int(os.getenv('DARTBOT_THREADS', 8))
+# Import api.py once in the master so the JSON files and precomputed tables are loaded a single time
+# and shared with the forked workers copy-on-write
+preload_app = True
+
+
+def when_ready(server):
+    # Move everything preload_app created into the GC's permanent generation. Collections in the
+    # workers then never touch those objects, so their pages stay shared instead of being copied.
+    gc.freeze()
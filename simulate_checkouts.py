@@ -1,8 +1,14 @@
 import os
 import csv
-import json
+import re
+import functools
 from collections import defaultdict, Counter
 
+import numpy as np
+import orjson
+
+from dartbot_core import load_records, t20_counts, fit_weighted_linear
+
 # Configuration
 FOLDER = os.path.dirname(os.path.abspath(__file__))
 DATA_FOLDER = os.path.join(FOLDER, 'Datasets')  # location for player input CSVs
@@ -36,31 +42,25 @@ def bin_label_for_avg(avg: float):
     return f"{BIN_END}+"
 
 # score mapping - converting everything into numeric points
+# beds look like t20 / d16 / i5 / o5 (inner and outer single), plus ibull and obull
+BED_RE = re.compile(r'([tdio])(\d+)')
+BED_MULTIPLIER = {'t': 3, 'd': 2, 'i': 1, 'o': 1}
+
+@functools.lru_cache(maxsize=None)
 def score_of(bed):
     bed = bed.lower()
-    if bed in ('ibull',):
+    if bed == 'ibull':
         return 50
-    if bed in ('obull',):
+    if bed == 'obull':
         return 25
-    if bed.startswith('t'):
-        try:
-            return 3 * int(bed[1:])
-        except:
-            return 0
-    if bed.startswith('d'):
-        try:
-            return 2 * int(bed[1:])
-        except:
-            return 0
-    if bed.startswith('i') or bed.startswith('o'):
-        try:
-            return int(bed[1:])
-        except:
-            return 0
-    # unknown
-    return 0
+    m = BED_RE.fullmatch(bed)
+    if m is None:
+        # unknown
+        return 0
+    return BED_MULTIPLIER[m.group(1)] * int(m.group(2))
 
 # checking if the it is a double bed
+@functools.lru_cache(maxsize=None)
 def is_double(bed):
     bed = bed.lower()
     if bed in ('ibull',):
@@ -71,51 +71,25 @@ def is_double(bed):
 
 # Read CSVs to build empirical distributions and per-file averages
 # Use Datasets/ subfolder if it exists to avoid mixing with output CSVs
-if os.path.isdir(DATA_FOLDER):
-    files = [f for f in os.listdir(DATA_FOLDER) if f.lower().endswith('.csv')]
-else:
-    files = [f for f in os.listdir(FOLDER) if f.lower().endswith('.csv')]
+records = load_records(DATA_FOLDER if os.path.isdir(DATA_FOLDER) else FOLDER)
 aim_empirical = defaultdict(Counter)  # how many landed in each bed per aimedat
 # Per bin empirical: bin_label = aimedat = Counter(actual_bed)
 aim_empirical_bins = defaultdict(lambda: defaultdict(Counter))
 aim_counts = Counter()  # total aimed at
 per_file_records = []  # headings
 
-for fname in sorted(files):
-    path = os.path.join(DATA_FOLDER if os.path.isdir(DATA_FOLDER) else FOLDER, fname)
-    try:
-        with open(path, newline='', encoding='utf-8') as fh:
-            raw = fh.read().splitlines()
-        filtered = [ln for ln in raw if not ln.strip().startswith('//') and ln.strip() != '']
-        if not filtered:
-            continue
-        reader = csv.DictReader(filtered)
-        if not reader.fieldnames:
-            continue
-        rows = list(reader)
-        if not rows:
-            continue
-        try:
-            avg = float(rows[0].get('average') or 0.0)
-        except:
-            avg = None
-        # accumulate per aim empirical
-        for row in rows:
-            aimed = (row.get('aimedat') or '').strip().lower()
-            bed = (row.get('bed') or '').strip().lower()
-            if aimed:
-                aim_empirical[aimed][bed] += 1
-                aim_counts[aimed] += 1
-                # also track per bin using this file's average
-                blabel = bin_label_for_avg(avg)
-                if blabel:
-                    aim_empirical_bins[blabel][aimed][bed] += 1
-        # also capture t20 stats for model
-        aimed_t20 = sum(1 for r in rows if (r.get('aimedat') or '').strip().lower() == 't20')
-        hits_t20 = sum(1 for r in rows if (r.get('aimedat') or '').strip().lower() == 't20' and (r.get('bed') or '').strip().lower() == 't20')
-        per_file_records.append((fname, avg, aimed_t20, hits_t20))
-    except Exception as e:
-        print(f"Error reading {fname}: {e}")
+for record in records:
+    avg = record.average
+    # accumulate per aim empirical, also tracking per bin using this file's average
+    blabel = bin_label_for_avg(avg)
+    for (aimed, bed), cnt in record.pair_counts.items():
+        aim_empirical[aimed][bed] += cnt
+        aim_counts[aimed] += cnt
+        if blabel:
+            aim_empirical_bins[blabel][aimed][bed] += cnt
+    # also capture t20 stats for model
+    aimed_t20, hits_t20, _ = t20_counts(record)
+    per_file_records.append((record.fname, avg, aimed_t20, hits_t20))
 
 # Fit weighted linear model for t20 hit rate like before
 data_points = []
@@ -124,19 +98,7 @@ for fname, avg, aimed, hits in per_file_records:
         continue
     data_points.append((avg, hits / aimed, aimed))
 
-slope = None
-intercept = None
-if len(data_points) >= 2:
-    xs = [d[0] for d in data_points]
-    ys = [d[1] for d in data_points]
-    ws = [d[2] for d in data_points]
-    W = sum(ws)
-    mean_x = sum(x * w for x, w in zip(xs, ws)) / W
-    mean_y = sum(y * w for y, w in zip(ys, ws)) / W
-    cov_xy = sum(w * (x - mean_x) * (y - mean_y) for x, y, w in zip(xs, ys, ws)) / W
-    var_x = sum(w * (x - mean_x) ** 2 for x, w in zip(xs, ws)) / W
-    slope = cov_xy / var_x if var_x != 0 else 0.0
-    intercept = mean_y - slope * mean_x
+slope, intercept, _ = fit_weighted_linear(data_points)
 
 # Dataset-wide average used as baseline when scaling empirical hit rates by player/bin average.
 valid_avgs = [avg for _, avg, _, _ in per_file_records if avg is not None]
@@ -323,6 +285,29 @@ for label, rep in bins:
         d[aimed] = build_distribution_for_aim(aimed, rep, label)
     bin_distributions[label] = d
 
+def outcome_table(probs):
+    """Flatten a bed -> probability distribution into parallel (scores, is_double, probs) tuples for the DP."""
+    return (
+        tuple(score_of(bed) for bed in probs),
+        tuple(is_double(bed) for bed in probs),
+        tuple(probs.values()),
+    )
+
+# the DP walks these flat tables instead of re-resolving every bed's score on each call
+bin_outcome_tables = {
+    label: {aimed: outcome_table(probs) for aimed, probs in d.items()}
+    for label, d in bin_distributions.items()
+}
+
+@functools.lru_cache(maxsize=None)
+def adhoc_outcome_table(aimed, bin_label):
+    # aims outside aim_targets_to_consider are built on the fly, once per (aim, bin)
+    return outcome_table(build_distribution_for_aim(
+        aimed,
+        float(bin_label.split('-')[0]) if '-' in bin_label else BIN_END,
+        bin_label
+    ))
+
 # Compute doubles outcomes per bin: hit double, miss inside (o/i), miss outside (m/bounceout), neighbours (singles/doubles on neighbouring numbers), and other
 def scale_double_outcomes_by_avg(base_outcomes: dict, target_avg: float, dataset_avg: float) -> dict:
     """
@@ -627,16 +612,16 @@ def compute_all_double_outcomes():
 CAN_PATH = os.path.join(FOLDER, 'checkout_candidates.json')
 if os.path.exists(CAN_PATH):
     try:
-        with open(CAN_PATH, 'r', encoding='utf-8') as fh:
-            candidates = json.load(fh)
+        with open(CAN_PATH, 'rb') as fh:
+            candidates = orjson.loads(fh.read())
     except Exception:
         print(f"Warning: could not read {CAN_PATH}, proceeding with empty strategies")
         candidates = {}
 else:
     candidates = {str(t): [] for t in range(2, 171)}
     try:
-        with open(CAN_PATH, 'w', encoding='utf-8') as fh:
-            json.dump(candidates, fh, indent=2)
+        with open(CAN_PATH, 'wb') as fh:
+            fh.write(orjson.dumps(candidates, option=orjson.OPT_INDENT_2))
         print(f"Wrote template candidate file to {CAN_PATH}. Edit it to add your preferred approaches per total.")
     except Exception:
         pass
@@ -653,51 +638,43 @@ def parse_candidate_sequence(item):
     return []
 
 # DP probability computation for a given sequence and bin (using precomputed distributions)
+# a dart moves every remaining score down by the points it scores, so one dart is a 1-D
+# convolution of the state with the aim's points distribution
+
+@functools.lru_cache(maxsize=None)
+def dart_transition(aimed, bin_label):
+    """
+    One-dart step for an aim in a bin, as (checkout, kernel), both indexed by points scored:
+    checkout[s] is the chance of scoring s with a double, kernel[s] the chance of scoring s at all.
+    kernel is stored reversed, ready for np.convolve.
+    """
+    table = bin_outcome_tables[bin_label].get(aimed)
+    if table is None:
+        table = adhoc_outcome_table(aimed, bin_label)
+    scores = np.array(table[0], dtype=np.intp)
+    doubles = np.array(table[1], dtype=bool)
+    probs = np.array(table[2], dtype=float)
+    size = int(scores.max()) + 1
+    checkout = np.bincount(scores[doubles], weights=probs[doubles], minlength=size)
+    kernel = np.bincount(scores, weights=probs, minlength=size)
+    return checkout, kernel[::-1].copy()
 
 def compute_success_prob_for_seq_given_T(seq, T, bin_label):
-    dist_map = bin_distributions[bin_label]
-    # states: mapping from remaining score -> prob
-    states = {T: 1.0}
+    # state[rem] is the probability of standing on rem before the next dart; darts only lower
+    # the score, so nothing above T is ever reached
+    n = T + 1
+    state = np.zeros(n)
+    state[T] = 1.0
     success = 0.0
     for aimed in seq:
-        new_states = defaultdict(float)
-        aimed = aimed.lower()
-        if aimed not in dist_map:
-            # build on the fly
-            probs = build_distribution_for_aim(
-                aimed,
-                float(bin_label.split('-')[0]) if '-' in bin_label else BIN_END,
-                bin_label
-            )
-        else:
-            probs = dist_map[aimed]
-        for rem, p_rem in list(states.items()):
-            if p_rem <= 0:
-                continue
-            for actual_bed, p_actual in probs.items():
-                sc = score_of(actual_bed)
-                p = p_rem * p_actual
-                # handling bust conditions
-                if sc > rem:
-                    # bust = turn ends (fail) (don't carry over)
-                    continue
-                new_rem = rem - sc
-                if new_rem == 0:
-                    # must be double
-                    if is_double(actual_bed):
-                        success += p
-                    else:
-                        # not double = bust
-                        continue
-                elif new_rem == 1:
-                    # cannot finish on 1 = bust
-                    continue
-                else:
-                    new_states[new_rem] += p
-        states = new_states
-        if not states:
-            break
-    return success
+        checkout, kernel = dart_transition(aimed.lower(), bin_label)
+        # reaching 0 exactly on a double finishes
+        m = min(n, len(checkout))
+        success += checkout[:m] @ state[:m]
+        # new[rem - s] += kernel[s] * state[rem]; overshooting, leaving 1 or reaching 0 are busts
+        state = np.convolve(state, kernel)[len(kernel) - 1:]
+        state[:2] = 0.0
+    return float(success)
 
 # Calculate "safety" score: how forgiving is this sequence if you miss the first dart
 # Higher safety means neighbours leave you in a better position for finishing
@@ -794,8 +771,9 @@ for label, rep in bins:
                     'is_one_dart': len(seq) == 1
                 })
         
-        # Sort by weighted probability first, then by safety
-        scored.sort(key=lambda x: (-x['success_prob_weighted'], -x['safety']))
+        # Sort by weighted probability first, then by safety. Probabilities are compared at 12 decimal
+        # places so candidates that tie exactly stay tied (and keep file order) whatever order the DP summed in
+        scored.sort(key=lambda x: (-round(x['success_prob_weighted'], 12), -x['safety']))
         
         # Find best and safest approaches
         best_seq = scored[0]['sequence'] if scored else None
@@ -836,9 +814,9 @@ for label, rep in bins:
             'safest_sequence': '|'.join(safest_seq) if safest_seq else '',
         })
 
-# write outputs
-with open(OUTPUT_JSON, 'w', encoding='utf-8') as fh:
-    json.dump({'bins': results}, fh, indent=2)
+# write outputs (orjson encodes in one native pass; kept indented so the files stay readable and diffable)
+with open(OUTPUT_JSON, 'wb') as fh:
+    fh.write(orjson.dumps({'bins': results}, option=orjson.OPT_INDENT_2))
 
 with open(OUTPUT_CSV, 'w', newline='', encoding='utf-8') as fh:
     writer = csv.DictWriter(fh, fieldnames=['average_level','avg_rep','total','best_sequence','best_success_prob','safest_sequence'])
@@ -848,8 +826,8 @@ with open(OUTPUT_CSV, 'w', newline='', encoding='utf-8') as fh:
 
     # Also compute and write doubles outcomes per bin
     double_outcomes = compute_all_double_outcomes()
-    with open(DOUBLES_JSON, 'w', encoding='utf-8') as fh:
-        json.dump({'bins': double_outcomes}, fh, indent=2)
+    with open(DOUBLES_JSON, 'wb') as fh:
+        fh.write(orjson.dumps({'bins': double_outcomes}, option=orjson.OPT_INDENT_2))
 
     with open(DOUBLES_CSV, 'w', newline='', encoding='utf-8') as fh:
         writer = csv.writer(fh)
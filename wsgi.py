@@ -0,0 +1,7 @@
+"""
+WSGI entry point for running the Dartbot API under a production server
+e.g. gunicorn -c gunicorn_conf.py wsgi:app
+"""
+from api import app
+
+__all__ = ['app']